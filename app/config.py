@@ -13,6 +13,7 @@ class Config(BaseModel):
     mistral_chat_model: str = os.getenv('MISTRAL_CHAT_MODEL', 'mistral-small-latest')
     mistral_ocr_model: str = os.getenv('MISTRAL_OCR_MODEL', 'mistral-ocr-latest')
     data_dir: str = os.getenv('DATA_DIR', 'data')
+    blob_retention_days: int = int(os.getenv('BLOB_RETENTION_DAYS', '30'))
 
 def get_config():
     return Config()
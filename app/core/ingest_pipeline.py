@@ -1,7 +1,10 @@
 import os
 import json
+import time
+import hashlib
+import contextlib
 import numpy as np
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 from pypdf import PdfReader
 from mistralai import Mistral
 from datetime import datetime
@@ -13,12 +16,132 @@ from app.core.utils import retry_with_backoff
 config = get_config()
 os.makedirs(config.data_dir, exist_ok=True)
 
+BLOB_DIR = os.path.join(config.data_dir, "blobs")
+META_FILE = os.path.join(config.data_dir, "metadata.jsonl")
+HASH_INDEX_FILE = os.path.join(config.data_dir, "content_index.json")
+SPOOL_CHUNK_SIZE = 1 << 20
+
 client = Mistral(api_key=config.mistral_api_key)
 
 
-def extract_text(file_path: str) -> str:
-    """Extract text from PDF, TXT, or MD files."""
-    ext = os.path.splitext(file_path)[1].lower()
+def blob_path(content_hash: str) -> str:
+    """Content-addressed location of a raw upload: blobs/<ab>/<sha256>."""
+    return os.path.join(BLOB_DIR, content_hash[:2], content_hash)
+
+
+def spool_upload(fileobj) -> Tuple[str, str]:
+    """
+    Stream an upload into the blob area while hashing it.
+    Returns (blob_path, sha256). Identical content maps to the same blob.
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    hasher = hashlib.sha256()
+    tmp_path = os.path.join(BLOB_DIR, f"spool-{uuid.uuid4()}.tmp")
+
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                block = fileobj.read(SPOOL_CHUNK_SIZE)
+                if not block:
+                    break
+                hasher.update(block)
+                out.write(block)
+    except BaseException:
+        # open() itself may have failed; don't mask the original error
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+    content_hash = hasher.hexdigest()
+    path = blob_path(content_hash)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+        os.utime(path)  # refresh retention clock
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    return path, content_hash
+
+
+def _meta_state() -> Optional[list]:
+    if not os.path.exists(META_FILE):
+        return None
+    st = os.stat(META_FILE)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _save_hash_index(hashes: dict):
+    tmp_path = f"{HASH_INDEX_FILE}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"meta_state": _meta_state(), "hashes": hashes}, f)
+    os.replace(tmp_path, HASH_INDEX_FILE)
+
+
+def load_hash_index() -> dict:
+    """
+    Map of content_hash -> [file_id, n_chunks] for ingested files.
+    Kept in content_index.json; rebuilt from metadata.jsonl only when
+    that file was changed by something other than ingest (delete, import).
+    """
+    if os.path.exists(HASH_INDEX_FILE):
+        with open(HASH_INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["meta_state"] == _meta_state():
+            return index["hashes"]
+
+    hashes = {}
+    if os.path.exists(META_FILE):
+        with open(META_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                meta = json.loads(line)
+                h = meta.get("content_hash")
+                if not h:
+                    continue
+                entry = hashes.setdefault(h, [meta["file_id"], 0])
+                if entry[0] == meta["file_id"]:
+                    entry[1] += 1
+    _save_hash_index(hashes)
+    return hashes
+
+
+def find_by_hash(content_hash: str, hashes: Optional[dict] = None) -> Optional[Tuple[str, int]]:
+    """Return (file_id, n_chunks) of an already-ingested file with this content, if any."""
+    if hashes is None:
+        hashes = load_hash_index()
+    entry = hashes.get(content_hash)
+    return tuple(entry) if entry else None
+
+
+def remove_blob(content_hash: str):
+    """Delete the raw blob stored for a content hash."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(blob_path(content_hash))
+
+
+def prune_blobs(retention_days: Optional[int] = None) -> int:
+    """
+    Remove raw blobs not uploaded (or re-uploaded) within the retention window.
+    Extracted chunks and embeddings are unaffected. Non-positive retention keeps blobs forever.
+    """
+    if retention_days is None:
+        retention_days = config.blob_retention_days
+    if retention_days <= 0 or not os.path.isdir(BLOB_DIR):
+        return 0
+
+    cutoff = time.time() - retention_days * 86400
+    removed = 0
+    for root, _, names in os.walk(BLOB_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def extract_text(file_path: str, ext: Optional[str] = None) -> str:
+    """Extract text from PDF, TXT, or MD files. `ext` overrides the path's extension (blobs have none)."""
+    ext = (ext or os.path.splitext(file_path)[1]).lower()
 
     if ext == ".pdf":
         reader = PdfReader(file_path)
@@ -64,7 +187,7 @@ def embed_chunks(chunks: List[str]) -> np.ndarray:
     return np.array(vectors, dtype=np.float32)
 
 
-def persist(chunks: List[str], embeddings: np.ndarray, source: str):
+def persist(chunks: List[str], embeddings: np.ndarray, source: str, content_hash: Optional[str] = None):
     """Append to local JSONL and NPY stores."""
     meta_path = os.path.join(config.data_dir, "metadata.jsonl")
     chunk_path = os.path.join(config.data_dir, "chunks.jsonl")
@@ -77,6 +200,17 @@ def persist(chunks: List[str], embeddings: np.ndarray, source: str):
         {"file_id": file_id, "source": source, "created_at": now, "chunk_id": i}
         for i in range(len(chunks))
     ]
+    if content_hash:
+        for m in metadatas:
+            m["content_hash"] = content_hash
+
+    # Append embeddings first: a stacking/shape error then fails before any JSONL row is written
+    existing = np.load(embed_path) if os.path.exists(embed_path) else None
+    if existing is not None and existing.size:
+        all_embeddings = np.vstack([existing, embeddings])
+    else:
+        all_embeddings = embeddings
+    np.save(embed_path, all_embeddings)
 
     # Append text chunks and metadata
     with open(chunk_path, "a", encoding="utf-8") as cf:
@@ -87,24 +221,46 @@ def persist(chunks: List[str], embeddings: np.ndarray, source: str):
         for m in metadatas:
             mf.write(json.dumps(m) + "\n")
 
-    # Append embeddings
-    if os.path.exists(embed_path):
-        existing = np.load(embed_path)
-        all_embeddings = np.vstack([existing, embeddings])
-    else:
-        all_embeddings = embeddings
-    np.save(embed_path, all_embeddings)
-
     return file_id
 
 
-def process_and_store(file_path: str):
+def process_and_store(file_path: str, source: Optional[str] = None, content_hash: Optional[str] = None):
     """Main ingestion routine for a file."""
-    text = extract_text(file_path)
+    text = extract_text(file_path, os.path.splitext(source)[1] if source else None)
     if not text.strip():
-        raise ValueError(f"No text extracted from {file_path}")
+        raise ValueError(f"No text extracted from {source or file_path}")
 
     chunks = chunk_text(text)
     embeddings = embed_chunks(chunks)
-    file_id = persist(chunks, embeddings, os.path.basename(file_path))
+    file_id = persist(chunks, embeddings, source or os.path.basename(file_path), content_hash)
     return len(chunks), file_id
+
+
+def ingest_upload(fileobj, filename: str, hashes: Optional[dict] = None) -> Tuple[int, str, bool]:
+    """
+    Spool an upload into the blob area and ingest it unless identical
+    content is already stored. Returns (n_chunks, file_id, duplicate).
+    Pass the same `hashes` (from load_hash_index) for every file in a batch.
+    """
+    if hashes is None:
+        hashes = load_hash_index()
+    path, content_hash = spool_upload(fileobj)
+
+    existing = find_by_hash(content_hash, hashes)
+    if existing:
+        file_id, n_chunks = existing
+        return n_chunks, file_id, True
+
+    meta_before = _meta_state()
+    try:
+        n_chunks, file_id = process_and_store(path, source=filename, content_hash=content_hash)
+    except Exception:
+        # Only drop the raw upload if no metadata row carrying its hash was written;
+        # otherwise the stale hash index is rebuilt from metadata on the next load
+        if _meta_state() == meta_before:
+            remove_blob(content_hash)
+        raise
+
+    hashes[content_hash] = [file_id, n_chunks]
+    _save_hash_index(hashes)
+    return n_chunks, file_id, False
@@ -1,19 +1,13 @@
-import os
-import json
 import numpy as np
 from typing import List, Tuple
 from mistralai import Mistral
 from app.config import get_config
 from app.core.utils import retry_with_backoff
+from app.core.snapshot import open_store
 
 config = get_config()
 client = Mistral(api_key=config.mistral_api_key)
 
-DATA_DIR = config.data_dir
-CHUNK_FILE = os.path.join(DATA_DIR, "chunks.jsonl")
-EMBED_FILE = os.path.join(DATA_DIR, "embeddings.npy")
-META_FILE = os.path.join(DATA_DIR, "metadata.jsonl")
-
 
 # ---------- INTENT DETECTION ----------
 def should_trigger_search(query: str) -> bool:
@@ -42,15 +36,15 @@ def retrieve_relevant_chunks(query: str, top_k: int = 5, min_sim: float = 0.55)
     Returns top_k chunks with similarity >= min_sim.
     """
 
-    # Load stored embeddings & chunks
-    if not os.path.exists(EMBED_FILE) or not os.path.exists(CHUNK_FILE):
+    # Memory-mapped view of stored embeddings & chunks
+    store = open_store()
+    if store is None:
         return []
 
-    embeddings = np.load(EMBED_FILE)
+    embeddings = store.embeddings
     if embeddings.size == 0:
         return []
-    with open(CHUNK_FILE, "r", encoding="utf-8") as f:
-        chunks = [json.loads(line)["text"] for line in f if line.strip()]
+    chunks = store.texts()
 
     if not chunks:
         return []
@@ -0,0 +1,460 @@
+import os
+import json
+import struct
+import hashlib
+import shutil
+import numpy as np
+from typing import List, Optional
+from datetime import datetime
+import uuid
+
+from app.config import get_config
+
+config = get_config()
+
+DATA_DIR = config.data_dir
+CHUNK_FILE = os.path.join(DATA_DIR, "chunks.jsonl")
+META_FILE = os.path.join(DATA_DIR, "metadata.jsonl")
+EMBED_FILE = os.path.join(DATA_DIR, "embeddings.npy")
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+STORE_SNAPSHOT = os.path.join(DATA_DIR, "store.msnap")
+
+# File layout: a fixed 64-byte prefix, then 64-byte aligned binary sections,
+# then a JSON header describing every section (offset, dtype, shape, sha256).
+#   prefix = magic(8) | format version(u32) | reserved(u32)
+#            | header offset(u64) | header length(u64) | header sha256(32)
+MAGIC = b"MSSNAP\x00\x01"
+FORMAT_VERSION = 1
+PREFIX = struct.Struct("<8sII QQ32s")
+ALIGN = 64
+SNAPSHOT_EXT = ".msnap"
+HEADER_KEYS = {"snapshot_id", "kind", "base_snapshot_id", "base_files", "corpus_files",
+               "embed_model", "rows", "dim", "files", "store_state", "sections"}
+SECTION_DTYPES = {
+    "embeddings": np.dtype("<f4"),
+    "text_offsets": np.dtype("<i8"),
+    "text_blob": np.dtype("u1"),
+    "file_index": np.dtype("<i4"),
+    "chunk_id": np.dtype("<i4"),
+}
+
+
+class SnapshotError(ValueError):
+    """Raised for corrupt, mismatched, or inapplicable snapshots."""
+
+
+# ---------- STORE I/O ----------
+def read_store():
+    """Load chunks, metadata and embeddings from the local JSONL/NPY store."""
+    if not os.path.exists(META_FILE) or not os.path.exists(CHUNK_FILE) or not os.path.exists(EMBED_FILE):
+        return [], [], np.zeros((0, 0), dtype=np.float32)
+
+    with open(META_FILE, "r", encoding="utf-8") as mf, open(CHUNK_FILE, "r", encoding="utf-8") as cf:
+        metas = [json.loads(line) for line in mf if line.strip()]
+        chunks = [json.loads(line)["text"] for line in cf if line.strip()]
+    embeddings = np.load(EMBED_FILE)
+
+    if not (len(metas) == len(chunks) == len(embeddings)):
+        raise SnapshotError("Local store is inconsistent: chunk, metadata and embedding counts differ.")
+    return chunks, metas, embeddings
+
+
+def write_store(chunks: List[str], metas: List[dict], embeddings: np.ndarray, append: bool = False):
+    """Write (or append) rows to the local JSONL/NPY store."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    mode = "a" if append else "w"
+
+    with open(CHUNK_FILE, mode, encoding="utf-8") as cf:
+        for ch in chunks:
+            cf.write(json.dumps({"text": ch}) + "\n")
+    with open(META_FILE, mode, encoding="utf-8") as mf:
+        for m in metas:
+            mf.write(json.dumps(m) + "\n")
+
+    if append and os.path.exists(EMBED_FILE):
+        existing = np.load(EMBED_FILE)
+        if existing.size:
+            embeddings = np.vstack([existing, embeddings]) if len(embeddings) else existing
+
+    if len(embeddings) == 0:
+        # A (0, 0) matrix cannot be stacked with real rows later; an empty store has no embeddings file
+        if os.path.exists(EMBED_FILE):
+            os.remove(EMBED_FILE)
+        return
+    np.save(EMBED_FILE, np.ascontiguousarray(embeddings, dtype=np.float32))
+
+
+# ---------- ENCODING ----------
+def _encode_strings(values: List[str]):
+    """Pack strings into one UTF-8 blob plus an (n + 1) int64 offset index."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def _build_sections(chunks: List[str], metas: List[dict], embeddings: np.ndarray):
+    """Turn store rows into columnar arrays and a per-file segment table."""
+    files, file_pos = [], {}
+    file_index = np.zeros(len(metas), dtype=np.int32)
+    for i, m in enumerate(metas):
+        fid = m["file_id"]
+        if fid not in file_pos:
+            file_pos[fid] = len(files)
+            files.append({
+                "file_id": fid,
+                "source": m["source"],
+                "created_at": m["created_at"],
+                "content_hash": m.get("content_hash"),
+                "start_row": i,
+                "rows": 0,
+            })
+        file_index[i] = file_pos[fid]
+        files[file_pos[fid]]["rows"] += 1
+
+    chunk_ids = np.array([m["chunk_id"] for m in metas], dtype=np.int32)
+    text_blob, text_offsets = _encode_strings(chunks)
+
+    dim = embeddings.shape[1] if embeddings.ndim == 2 else 0
+    sections = {
+        "embeddings": np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(chunks), dim),
+        "text_offsets": text_offsets,
+        "text_blob": text_blob,
+        "file_index": file_index,
+        "chunk_id": chunk_ids,
+    }
+    return sections, files, dim
+
+
+def _check_embed_model(header: dict):
+    """Vectors from a different embedding model are not comparable with local queries."""
+    if header.get("embed_model") != config.mistral_embed_model:
+        raise SnapshotError(
+            f"Snapshot '{header.get('snapshot_id')}' was built with embedding model "
+            f"'{header.get('embed_model')}', but this node uses '{config.mistral_embed_model}'."
+        )
+
+
+# ---------- EXPORT ----------
+def export_snapshot(path: str, base_path: Optional[str] = None, store_state: Optional[list] = None) -> dict:
+    """
+    Write the current store to a single snapshot file at `path`.
+    With `base_path`, only files (segments) added since that snapshot are written.
+    `store_state` is recorded so the serving snapshot can detect when it is stale.
+    Returns the snapshot header.
+    """
+    chunks, metas, embeddings = read_store()
+    corpus_files = list(dict.fromkeys(m["file_id"] for m in metas))
+
+    base = None
+    if base_path:
+        base = read_header(base_path)
+        _check_embed_model(base)
+        base_files = set(base["corpus_files"])
+        missing = base_files.difference(corpus_files)
+        if missing:
+            raise SnapshotError(
+                f"Cannot build incremental snapshot: {len(missing)} file(s) from the base snapshot were deleted."
+            )
+        keep = [i for i, m in enumerate(metas) if m["file_id"] not in base_files]
+        chunks = [chunks[i] for i in keep]
+        metas = [metas[i] for i in keep]
+        embeddings = embeddings[keep] if len(keep) else embeddings[:0]
+        if base["dim"] and len(keep) and embeddings.shape[1] != base["dim"]:
+            raise SnapshotError("Embedding dimension differs from the base snapshot.")
+
+    sections, files, dim = _build_sections(chunks, metas, embeddings)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "snapshot_id": str(uuid.uuid4()),
+        "created_at": datetime.utcnow().isoformat(),
+        "kind": "incremental" if base else "full",
+        "base_snapshot_id": base["snapshot_id"] if base else None,
+        "base_files": base["corpus_files"] if base else [],
+        "corpus_files": corpus_files,
+        "embed_model": config.mistral_embed_model,
+        "rows": len(chunks),
+        "dim": dim,
+        "files": files,
+        "store_state": store_state,
+        "sections": {},
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        _write_sections(tmp_path, header, sections)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return header
+
+
+def _write_sections(path: str, header: dict, sections: dict):
+    """Write the prefix, aligned sections and header; fills in header["sections"]."""
+    with open(path, "wb") as f:
+        f.write(b"\x00" * PREFIX.size)
+        for name, arr in sections.items():
+            pad = (-f.tell()) % ALIGN
+            f.write(b"\x00" * pad)
+            data = arr.tobytes()
+            header["sections"][name] = {
+                "offset": f.tell(),
+                "nbytes": len(data),
+                "dtype": arr.dtype.str,
+                "shape": list(arr.shape),
+                "sha256": hashlib.sha256(data).hexdigest(),
+            }
+            f.write(data)
+
+        _write_header(f, f.tell(), header)
+
+
+def _write_header(f, header_offset: int, header: dict):
+    """Write the trailing JSON header at `header_offset` and point the prefix at it."""
+    header_bytes = json.dumps(header).encode("utf-8")
+    f.seek(header_offset)
+    f.write(header_bytes)
+    f.truncate()
+    f.seek(0)
+    f.write(PREFIX.pack(
+        MAGIC, FORMAT_VERSION, 0,
+        header_offset, len(header_bytes), hashlib.sha256(header_bytes).digest(),
+    ))
+
+
+# ---------- LOAD ----------
+def read_header(path: str) -> dict:
+    """Read and verify the JSON header of a snapshot without touching its sections."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        prefix = f.read(PREFIX.size)
+        if len(prefix) != PREFIX.size:
+            raise SnapshotError(f"Not a snapshot file: {path}")
+        magic, version, _, header_offset, header_len, header_sha = PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise SnapshotError(f"Not a snapshot file: {path}")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format version: {version}")
+        # The prefix is untrusted until the header checksum matches; bound the read first
+        if header_offset < PREFIX.size or header_offset + header_len > size:
+            raise SnapshotError("Snapshot header lies outside the file.")
+        f.seek(header_offset)
+        header_bytes = f.read(header_len)
+
+    if hashlib.sha256(header_bytes).digest() != header_sha:
+        raise SnapshotError("Snapshot header checksum mismatch.")
+    return json.loads(header_bytes)
+
+
+class Snapshot:
+    """
+    Memory-mapped view over a snapshot file.
+    Arrays are paged in lazily by the OS, so opening is O(header size).
+    Section checksums are only checked by `verify()`, which reads the whole file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = read_header(path)
+        missing = HEADER_KEYS.difference(self.header)
+        if missing:
+            raise SnapshotError(f"Snapshot header is missing fields: {', '.join(sorted(missing))}")
+        self.files = self.header["files"]
+        self.sections = {}
+
+        rows, dim = self.header["rows"], self.header["dim"]
+        if not isinstance(rows, int) or not isinstance(dim, int) or rows < 0 or dim < 0:
+            raise SnapshotError("Snapshot header has an invalid row count or dimension.")
+        expected_shapes = {
+            "embeddings": (rows, dim),
+            "text_offsets": (rows + 1,),
+            "file_index": (rows,),
+            "chunk_id": (rows,),
+        }
+        size = os.path.getsize(path)
+
+        for name, dtype in SECTION_DTYPES.items():
+            spec = self.header["sections"].get(name)
+            if spec is None:
+                raise SnapshotError(f"Snapshot is missing section '{name}'.")
+            shape = tuple(spec["shape"])
+            if np.dtype(spec["dtype"]) != dtype or len(shape) != (2 if name == "embeddings" else 1):
+                raise SnapshotError(f"Snapshot section '{name}' has an unexpected layout.")
+            if name in expected_shapes and shape != expected_shapes[name]:
+                raise SnapshotError(f"Snapshot section '{name}' does not match the header row count.")
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            if spec["nbytes"] != nbytes or spec["offset"] < PREFIX.size or spec["offset"] + nbytes > size:
+                raise SnapshotError(f"Snapshot section '{name}' lies outside the file.")
+
+            if nbytes == 0:
+                arr = np.zeros(shape, dtype=dtype)
+            else:
+                arr = np.memmap(path, dtype=dtype, mode="r", offset=spec["offset"], shape=shape)
+            self.sections[name] = arr
+
+        self.embeddings = self.sections["embeddings"]
+        self.text_offsets = self.sections["text_offsets"]
+        self.text_blob = self.sections["text_blob"]
+        self.file_index = self.sections["file_index"]
+        self.chunk_ids = self.sections["chunk_id"]
+        self._texts = None
+
+        if self.text_offsets[0] != 0 or self.text_offsets[-1] != len(self.text_blob):
+            raise SnapshotError("Snapshot text index does not match the text blob.")
+
+    def __len__(self) -> int:
+        return self.header["rows"]
+
+    def verify(self):
+        """Check every section against its SHA-256 checksum."""
+        for name, arr in self.sections.items():
+            if hashlib.sha256(arr.reshape(-1).view(np.uint8)).hexdigest() != self.header["sections"][name]["sha256"]:
+                raise SnapshotError(f"Checksum mismatch in snapshot section '{name}'.")
+
+        # Checksums only prove the writer's intent; also reject internally inconsistent indexes
+        if len(self) and np.any(np.diff(self.text_offsets) < 0):
+            raise SnapshotError("Snapshot text offsets are not monotonic.")
+        if len(self) and (self.file_index.min() < 0 or self.file_index.max() >= len(self.files)):
+            raise SnapshotError("Snapshot file index points outside the file table.")
+
+    def text(self, i: int) -> str:
+        start, end = int(self.text_offsets[i]), int(self.text_offsets[i + 1])
+        return self.text_blob[start:end].tobytes().decode("utf-8")
+
+    def metadata(self, i: int) -> dict:
+        f = self.files[int(self.file_index[i])]
+        meta = {
+            "file_id": f["file_id"],
+            "source": f["source"],
+            "created_at": f["created_at"],
+            "chunk_id": int(self.chunk_ids[i]),
+        }
+        if f.get("content_hash"):
+            meta["content_hash"] = f["content_hash"]
+        return meta
+
+    def texts(self) -> List[str]:
+        # Snapshots are immutable, so the decoded text can be reused across queries
+        if self._texts is None:
+            self._texts = [self.text(i) for i in range(len(self))]
+        return self._texts
+
+    def metadatas(self) -> List[dict]:
+        return [self.metadata(i) for i in range(len(self))]
+
+
+def load_snapshot(path: str, verify: bool = False) -> Snapshot:
+    """Open a snapshot; pass `verify=True` for untrusted files (imports, replication)."""
+    try:
+        snap = Snapshot(path)
+    except SnapshotError:
+        raise
+    except (KeyError, TypeError, ValueError) as e:
+        raise SnapshotError(f"Malformed snapshot {path}: {e}")
+    if verify:
+        snap.verify()
+    return snap
+
+
+# ---------- SERVING ----------
+_store_cache = {"state": None, "snap": None}
+
+
+def _store_state() -> Optional[list]:
+    """(size, mtime_ns) of each store file; changes whenever ingest or delete writes."""
+    state = []
+    for f in (CHUNK_FILE, META_FILE, EMBED_FILE):
+        if not os.path.exists(f):
+            return None
+        st = os.stat(f)
+        state.append([st.st_size, st.st_mtime_ns])
+    return state
+
+
+def open_store() -> Optional[Snapshot]:
+    """
+    Memory-mapped view of the local store, backed by data/store.msnap.
+    The JSONL/NPY files are only parsed to rebuild it after ingest or delete
+    changed them; a restart with an up-to-date store.msnap just maps it.
+    """
+    state = _store_state()
+    if state is None:
+        return None
+    if _store_cache["state"] == state:
+        return _store_cache["snap"]
+
+    snap = None
+    if os.path.exists(STORE_SNAPSHOT):
+        try:
+            snap = load_snapshot(STORE_SNAPSHOT)
+        except SnapshotError:
+            snap = None
+        if snap is not None and snap.header["store_state"] != state:
+            snap = None
+
+    if snap is None:
+        export_snapshot(STORE_SNAPSHOT, store_state=state)
+        snap = load_snapshot(STORE_SNAPSHOT)
+
+    _store_cache.update(state=state, snap=snap)
+    return snap
+
+
+def _install_store_snapshot(path: str, header: dict, state: list):
+    """
+    Copy a verified full snapshot into place as store.msnap.
+    Sections are copied byte for byte; only the trailing header is rewritten
+    to stamp the new store state.
+    """
+    tmp_path = f"{STORE_SNAPSHOT}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copyfile(path, tmp_path)
+        with open(tmp_path, "r+b") as f:
+            header_offset = PREFIX.unpack(f.read(PREFIX.size))[3]
+            _write_header(f, header_offset, dict(header, store_state=state))
+        os.replace(tmp_path, STORE_SNAPSHOT)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ---------- IMPORT ----------
+def import_snapshot(path: str) -> dict:
+    """
+    Apply a snapshot to the local store.
+    Full snapshots replace the store; incremental ones are appended after
+    checking that the store matches the snapshot's base.
+    """
+    snap = load_snapshot(path, verify=True)
+    header = snap.header
+    _check_embed_model(header)
+
+    if header["kind"] == "incremental":
+        _, metas, embeddings = read_store()
+        current = set(m["file_id"] for m in metas)
+        if current != set(header["base_files"]):
+            raise SnapshotError(
+                f"Store does not match base snapshot '{header['base_snapshot_id']}'; import that snapshot first."
+            )
+        if len(snap) and embeddings.size and embeddings.shape[1] != header["dim"]:
+            raise SnapshotError("Embedding dimension differs from the local store.")
+        write_store(snap.texts(), snap.metadatas(), np.asarray(snap.embeddings), append=True)
+    else:
+        write_store(snap.texts(), snap.metadatas(), np.asarray(snap.embeddings))
+        # The imported file already is the serving layout; no need to rebuild it from JSONL
+        state = _store_state()
+        if state is not None:
+            _install_store_snapshot(path, header, state)
+
+    # Incrementals rebuild the serving snapshot here rather than on the first query
+    open_store()
+    return header
+
+
+def snapshot_path(snapshot_id: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, snapshot_id + SNAPSHOT_EXT)
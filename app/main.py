@@ -4,7 +4,7 @@ from fastapi.staticfiles import StaticFiles
 
 from app.config import get_config
 from app.models import StatusResponse
-from app.routes import ingest, query, delete, files
+from app.routes import ingest, query, delete, files, snapshot
 
 config = get_config()
 
@@ -20,6 +20,7 @@ app.include_router(ingest.router)
 app.include_router(query.router)
 app.include_router(delete.router)
 app.include_router(files.router)
+app.include_router(snapshot.router)
 
 @app.get('/status', response_model=StatusResponse)
 async def status_check():
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException
 import os
 import json
+import shutil
 import numpy as np
 from app.config import get_config
+from app.core.ingest_pipeline import BLOB_DIR, HASH_INDEX_FILE, remove_blob
+from app.core.snapshot import STORE_SNAPSHOT
 
 router = APIRouter(prefix="/delete", tags=["admin"])
 config = get_config()
@@ -15,9 +18,10 @@ EMBED_FILE = os.path.join(config.data_dir, "embeddings.npy")
 @router.delete("/all", summary="Delete all indexed data")
 async def delete_all():
     """Completely remove all knowledge base data."""
-    for f in [CHUNK_FILE, META_FILE, EMBED_FILE]:
+    for f in [CHUNK_FILE, META_FILE, EMBED_FILE, STORE_SNAPSHOT, HASH_INDEX_FILE]:
         if os.path.exists(f):
             os.remove(f)
+    shutil.rmtree(BLOB_DIR, ignore_errors=True)
     return {"deleted": "all", "status": "cleared"}
 
 @router.delete("/{file_id}", summary="Delete a specific ingested file by ID")
@@ -48,6 +52,11 @@ async def delete_file(file_id: str):
             cf.write(json.dumps(c) + "\n")
     np.save(EMBED_FILE, new_embeddings)
 
+    # Drop the raw upload too, unless other rows still reference the same content
+    dropped_hash = metas[indices_to_drop[0]].get("content_hash")
+    if dropped_hash and not any(m.get("content_hash") == dropped_hash for m in new_metas):
+        remove_blob(dropped_hash)
+
     return {
         "deleted_file_id": file_id,
         "removed_chunks": len(indices_to_drop),
@@ -1,30 +1,23 @@
 from fastapi import APIRouter
-import os
-import json
-from app.config import get_config
+from app.core.snapshot import open_store
 
 router = APIRouter(prefix="/files", tags=["files"])
-config = get_config()
 
 
 @router.get("", summary="List ingested files")
 async def list_files():
-    meta_path = os.path.join(config.data_dir, "metadata.jsonl")
-    if not os.path.exists(meta_path):
+    store = open_store()
+    if store is None:
         return {"files": []}
 
-    files = {}
-    with open(meta_path, "r", encoding="utf-8") as f:
-        for line in f:
-            meta = json.loads(line)
-            fid = meta["file_id"]
-            if fid not in files:
-                files[fid] = {
-                    "file": meta["source"],
-                    "file_id": fid,
-                    "count": 0,
-                    "created_at": meta["created_at"]
-                }
-            files[fid]["count"] += 1
-
-    return {"files": sorted(files.values(), key=lambda x: x["created_at"], reverse=True)}
+    # Per-file segment table from the snapshot header; no per-chunk scan
+    files = [
+        {
+            "file": f["source"],
+            "file_id": f["file_id"],
+            "count": f["rows"],
+            "created_at": f["created_at"],
+        }
+        for f in store.files
+    ]
+    return {"files": sorted(files, key=lambda x: x["created_at"], reverse=True)}
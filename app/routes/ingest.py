@@ -1,9 +1,8 @@
 from fastapi import APIRouter, UploadFile, File
 import os
-import shutil
 from typing import List
 
-from app.core.ingest_pipeline import process_and_store
+from app.core.ingest_pipeline import ingest_upload, load_hash_index, prune_blobs
 from app.config import get_config
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
@@ -15,19 +14,18 @@ async def ingest_files(files: List[UploadFile] = File(...)):
     os.makedirs(config.data_dir, exist_ok=True)
     
     saved = []
+    hashes = load_hash_index()
     for f in files:
         # Make sure filename is a string
-        filename = f.filename or "unnamed_file"
-        ext = os.path.splitext(str(filename))[1].lower()
+        filename = os.path.basename(str(f.filename or "unnamed_file"))
+        ext = os.path.splitext(filename)[1].lower()
 
         if ext not in [".pdf", ".txt", ".md"]:
             continue  # skip unsupported
 
-        save_path = os.path.join(config.data_dir, filename)
-        with open(save_path, "wb") as out:
-            shutil.copyfileobj(f.file, out)
-
-        n_chunks, file_id = process_and_store(save_path)
-        saved.append({"file": f.filename, "file_id": file_id, "chunks": n_chunks})
+        # Streamed into the content-addressed blob area; identical content is not re-ingested
+        n_chunks, file_id, duplicate = ingest_upload(f.file, filename, hashes)
+        saved.append({"file": f.filename, "file_id": file_id, "chunks": n_chunks, "duplicate": duplicate})
 
+    prune_blobs()
     return {"ingested": saved}
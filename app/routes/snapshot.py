@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.responses import FileResponse
+from typing import Optional
+import os
+import shutil
+import uuid
+
+from app.core.snapshot import (
+    SNAPSHOT_DIR,
+    SNAPSHOT_EXT,
+    SnapshotError,
+    export_snapshot,
+    import_snapshot,
+    read_header,
+    snapshot_path,
+)
+
+router = APIRouter(prefix="/snapshot", tags=["admin"])
+
+
+def _resolve(snapshot_id: str) -> str:
+    try:
+        uuid.UUID(snapshot_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid snapshot ID '{snapshot_id}'.")
+    path = snapshot_path(snapshot_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Snapshot '{snapshot_id}' not found.")
+    return path
+
+
+def _summary(header: dict) -> dict:
+    return {k: header[k] for k in ("snapshot_id", "kind", "base_snapshot_id", "created_at", "rows", "dim")} | {
+        "files": len(header["files"]),
+    }
+
+
+@router.post("", summary="Export the knowledge base to a binary snapshot")
+async def create_snapshot(base: Optional[str] = None):
+    """Full snapshot by default; pass `base` to ship only files added since that snapshot."""
+    base_path = _resolve(base) if base else None
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp_path = os.path.join(SNAPSHOT_DIR, f"export-{uuid.uuid4()}.tmp")
+    try:
+        header = export_snapshot(tmp_path, base_path=base_path)
+        os.replace(tmp_path, snapshot_path(header["snapshot_id"]))
+    except SnapshotError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return _summary(header)
+
+
+@router.get("", summary="List stored snapshots")
+async def list_snapshots():
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return {"snapshots": []}
+
+    snapshots = []
+    for name in os.listdir(SNAPSHOT_DIR):
+        if not name.endswith(SNAPSHOT_EXT):
+            continue
+        try:
+            snapshots.append(_summary(read_header(os.path.join(SNAPSHOT_DIR, name))))
+        except SnapshotError:
+            continue
+    return {"snapshots": sorted(snapshots, key=lambda x: x["created_at"], reverse=True)}
+
+
+@router.get("/{snapshot_id}", summary="Download a snapshot file")
+async def download_snapshot(snapshot_id: str):
+    path = _resolve(snapshot_id)
+    return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
+
+@router.post("/import", summary="Load a snapshot into the knowledge base")
+async def upload_snapshot(file: UploadFile = File(...)):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp_path = os.path.join(SNAPSHOT_DIR, f"import-{uuid.uuid4()}.tmp")
+    try:
+        with open(tmp_path, "wb") as out:
+            shutil.copyfileobj(file.file, out)
+        header = import_snapshot(tmp_path)
+        # Keep the imported file so it can serve as the base for later incrementals
+        os.replace(tmp_path, snapshot_path(header["snapshot_id"]))
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"imported": _summary(header)}
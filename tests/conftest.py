@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+import pytest
+
+# Modules read DATA_DIR at import time; keep them away from the real ./data
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="meetsync-test-")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Point the snapshot module's store files at a fresh directory."""
+    from app.core import snapshot
+
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.setattr(snapshot, "DATA_DIR", str(data))
+    monkeypatch.setattr(snapshot, "CHUNK_FILE", str(data / "chunks.jsonl"))
+    monkeypatch.setattr(snapshot, "META_FILE", str(data / "metadata.jsonl"))
+    monkeypatch.setattr(snapshot, "EMBED_FILE", str(data / "embeddings.npy"))
+    monkeypatch.setattr(snapshot, "STORE_SNAPSHOT", str(data / "store.msnap"))
+    monkeypatch.setattr(snapshot, "_store_cache", {"state": None, "snap": None})
+    return data
@@ -0,0 +1,68 @@
+import hashlib
+import io
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("mistralai")
+pytest.importorskip("pypdf")
+
+from app.core import ingest_pipeline, snapshot
+
+
+@pytest.fixture
+def pipeline(store, monkeypatch):
+    """Share the snapshot fixture's store directory and skip the embedding API."""
+    monkeypatch.setattr(ingest_pipeline.config, "data_dir", str(store))
+    monkeypatch.setattr(ingest_pipeline, "BLOB_DIR", str(store / "blobs"))
+    monkeypatch.setattr(ingest_pipeline, "META_FILE", str(store / "metadata.jsonl"))
+    monkeypatch.setattr(ingest_pipeline, "HASH_INDEX_FILE", str(store / "content_index.json"))
+    monkeypatch.setattr(ingest_pipeline, "embed_chunks", lambda chunks: np.ones((len(chunks), 4), dtype=np.float32))
+    return store
+
+
+def test_ingest_after_importing_empty_snapshot(pipeline, tmp_path):
+    snapshot.export_snapshot(str(tmp_path / "empty.msnap"))
+    snapshot.import_snapshot(str(tmp_path / "empty.msnap"))
+
+    n_chunks, file_id, duplicate = ingest_pipeline.ingest_upload(io.BytesIO(b"Hello there. General Kenobi."), "a.md")
+    assert not duplicate
+
+    store = snapshot.open_store()
+    assert len(store) == n_chunks
+    assert store.files[0]["file_id"] == file_id
+
+
+def test_same_content_under_another_extension_shares_one_blob(pipeline):
+    data = b"Decisions were made. Then more decisions."
+    _, file_id, _ = ingest_pipeline.ingest_upload(io.BytesIO(data), "a.txt")
+    _, dup_id, duplicate = ingest_pipeline.ingest_upload(io.BytesIO(data), "b.md")
+
+    assert duplicate and dup_id == file_id
+    blobs = [name for _, _, names in os.walk(pipeline / "blobs") for name in names]
+    assert blobs == [hashlib.sha256(data).hexdigest()]
+
+
+def test_failed_extraction_removes_blob(pipeline):
+    with pytest.raises(ValueError, match="No text extracted"):
+        ingest_pipeline.ingest_upload(io.BytesIO(b"   \n "), "e.txt")
+
+    assert not any(names for _, _, names in os.walk(pipeline / "blobs"))
+
+
+def test_blob_is_kept_when_rows_were_written_before_failure(pipeline, monkeypatch):
+    persist = ingest_pipeline.persist
+
+    def persist_then_fail(*args, **kwargs):
+        persist(*args, **kwargs)
+        raise RuntimeError("disk went away")
+
+    monkeypatch.setattr(ingest_pipeline, "persist", persist_then_fail)
+    data = b"Half written. Still referenced."
+    with pytest.raises(RuntimeError):
+        ingest_pipeline.ingest_upload(io.BytesIO(data), "a.md")
+
+    content_hash = hashlib.sha256(data).hexdigest()
+    assert os.path.exists(ingest_pipeline.blob_path(content_hash))
+    assert ingest_pipeline.find_by_hash(content_hash) is not None
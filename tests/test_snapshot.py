@@ -0,0 +1,178 @@
+import hashlib
+import json
+
+import numpy as np
+import pytest
+
+from app.core import snapshot
+
+
+def add_file(file_id, texts, dim=4):
+    metas = [
+        {"file_id": file_id, "source": f"{file_id}.md", "created_at": "2025-01-01T00:00:00", "chunk_id": i}
+        for i in range(len(texts))
+    ]
+    embeddings = np.random.default_rng(len(file_id)).random((len(texts), dim), dtype=np.float32)
+    snapshot.write_store(texts, metas, embeddings, append=True)
+
+
+def clear_store(store):
+    for f in ("chunks.jsonl", "metadata.jsonl", "embeddings.npy", "store.msnap"):
+        (store / f).unlink(missing_ok=True)
+
+
+def test_empty_store_round_trip(store, tmp_path):
+    header = snapshot.export_snapshot(str(tmp_path / "empty.msnap"))
+    assert header["rows"] == 0
+
+    snapshot.import_snapshot(str(tmp_path / "empty.msnap"))
+    assert not (store / "embeddings.npy").exists()
+    assert snapshot.open_store() is None
+
+    add_file("a", ["alpha", "beta"])
+    chunks, metas, embeddings = snapshot.read_store()
+    assert chunks == ["alpha", "beta"]
+    assert embeddings.shape == (2, 4)
+
+
+def rewrite_header(path, header, header_len=None):
+    """Replace a snapshot's trailing header, keeping the prefix checksum valid."""
+    with open(path, "r+b") as f:
+        magic, version, _, offset, _, _ = snapshot.PREFIX.unpack(f.read(snapshot.PREFIX.size))
+        data = json.dumps(header).encode("utf-8")
+        f.seek(offset)
+        f.write(data)
+        f.truncate()
+        f.seek(0)
+        f.write(snapshot.PREFIX.pack(
+            magic, version, 0, offset, header_len or len(data), hashlib.sha256(data).digest(),
+        ))
+
+
+def test_header_length_past_end_of_file_is_rejected(store, tmp_path):
+    add_file("a", ["alpha"])
+    path = str(tmp_path / "full.msnap")
+    header = snapshot.export_snapshot(path)
+    rewrite_header(path, header, header_len=2 ** 62)
+
+    with pytest.raises(snapshot.SnapshotError, match="outside the file"):
+        snapshot.load_snapshot(path)
+
+
+def test_checksummed_but_inconsistent_snapshot_is_rejected(store, tmp_path):
+    add_file("a", ["alpha", "beta"])
+    path = str(tmp_path / "full.msnap")
+    header = snapshot.export_snapshot(path)
+    header["rows"] = 3
+    rewrite_header(path, header)
+
+    with pytest.raises(snapshot.SnapshotError, match="row count"):
+        snapshot.import_snapshot(path)
+
+
+def test_full_import_installs_serving_snapshot_without_rebuild(store, tmp_path, monkeypatch):
+    add_file("a", ["alpha", "beta"])
+    add_file("b", ["gamma"])
+    path = str(tmp_path / "full.msnap")
+    snapshot.export_snapshot(path)
+    clear_store(store)
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("store.msnap was rebuilt from JSONL")
+
+    monkeypatch.setattr(snapshot, "export_snapshot", no_rebuild)
+    snapshot.import_snapshot(path)
+
+    served = snapshot.open_store()
+    assert served.texts() == ["alpha", "beta", "gamma"]
+    assert [f["file_id"] for f in served.files] == ["a", "b"]
+
+
+def test_full_round_trip(store, tmp_path):
+    add_file("a", ["alpha", "beta é"])
+    add_file("b", ["gamma"])
+    before = snapshot.read_store()
+    path = str(tmp_path / "full.msnap")
+    header = snapshot.export_snapshot(path)
+    assert header["kind"] == "full" and header["rows"] == 3
+
+    clear_store(store)
+    snapshot.import_snapshot(path)
+    after = snapshot.read_store()
+    assert after[0] == before[0]
+    assert after[1] == before[1]
+    np.testing.assert_array_equal(after[2], before[2])
+
+
+def test_incremental_chain(store, tmp_path):
+    add_file("a", ["alpha"])
+    full = str(tmp_path / "full.msnap")
+    snapshot.export_snapshot(full)
+    add_file("b", ["beta", "gamma"])
+    inc1 = str(tmp_path / "inc1.msnap")
+    header = snapshot.export_snapshot(inc1, base_path=full)
+    assert header["kind"] == "incremental"
+    assert [f["file_id"] for f in header["files"]] == ["b"]
+    add_file("c", ["delta"])
+    inc2 = str(tmp_path / "inc2.msnap")
+    assert [f["file_id"] for f in snapshot.export_snapshot(inc2, base_path=inc1)["files"]] == ["c"]
+    before = snapshot.read_store()
+
+    clear_store(store)
+    for path in (full, inc1, inc2):
+        snapshot.import_snapshot(path)
+    after = snapshot.read_store()
+    assert after[0] == before[0]
+    assert after[1] == before[1]
+    np.testing.assert_array_equal(after[2], before[2])
+    assert len(snapshot.open_store()) == 4
+
+
+def test_bit_flip_is_rejected_by_checksum(store, tmp_path):
+    add_file("a", ["alpha", "beta"])
+    path = str(tmp_path / "full.msnap")
+    header = snapshot.export_snapshot(path)
+    offset = header["sections"]["text_blob"]["offset"]
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)[0]
+        f.seek(offset)
+        f.write(bytes([byte ^ 1]))
+
+    snapshot.load_snapshot(path)  # opening alone does not hash sections
+    with pytest.raises(snapshot.SnapshotError, match="Checksum mismatch"):
+        snapshot.import_snapshot(path)
+
+
+def test_incremental_requires_matching_base(store, tmp_path):
+    add_file("a", ["alpha"])
+    full = str(tmp_path / "full.msnap")
+    snapshot.export_snapshot(full)
+    add_file("b", ["beta"])
+    inc = str(tmp_path / "inc.msnap")
+    snapshot.export_snapshot(inc, base_path=full)
+
+    clear_store(store)
+    with pytest.raises(snapshot.SnapshotError, match="does not match base"):
+        snapshot.import_snapshot(inc)
+
+
+def test_incremental_export_fails_when_base_file_was_deleted(store, tmp_path):
+    add_file("a", ["alpha"])
+    full = str(tmp_path / "full.msnap")
+    snapshot.export_snapshot(full)
+    clear_store(store)
+    add_file("b", ["beta"])
+
+    with pytest.raises(snapshot.SnapshotError, match="were deleted"):
+        snapshot.export_snapshot(str(tmp_path / "inc.msnap"), base_path=full)
+
+
+def test_embed_model_mismatch_is_rejected(store, tmp_path, monkeypatch):
+    add_file("a", ["alpha"])
+    path = str(tmp_path / "full.msnap")
+    snapshot.export_snapshot(path)
+    monkeypatch.setattr(snapshot.config, "mistral_embed_model", "other-embed")
+
+    with pytest.raises(snapshot.SnapshotError, match="embedding model"):
+        snapshot.import_snapshot(path)